@@ -1,9 +1,11 @@
 import hashlib
 import re
+import threading
 import time
 from functools import lru_cache
 from typing import Optional
 
+from cachetools import TTLCache
 from prometheus_client import Counter
 from rest_framework.throttling import SimpleRateThrottle, BaseThrottle, UserRateThrottle
 from rest_framework.request import Request
@@ -120,7 +122,7 @@ class PersonalApiKeyRateThrottle(SimpleRateThrottle):
             if team_id is not None and self.scope == HogQLQueryThrottle.scope:
                 self.load_team_rate_limit(team_id)
 
-            request_would_be_allowed = super().allow_request(request, view)
+            request_would_be_allowed = self.request_would_be_allowed(request, view, personal_api_key)
             if request_would_be_allowed:
                 return True
 
@@ -160,6 +162,12 @@ class PersonalApiKeyRateThrottle(SimpleRateThrottle):
             capture_exception(e)
             return True
 
+    def request_would_be_allowed(self, request, view, personal_api_key: Optional[tuple[str, str]]) -> bool:
+        """
+        Whether the request is within the rate limit, without any of the bypass logic or reporting
+        """
+        return super().allow_request(request, view)
+
     def get_cache_key(self, request, view):
         """
         Tries the following options in order:
@@ -189,6 +197,84 @@ class PersonalApiKeyRateThrottle(SimpleRateThrottle):
         return self.cache_format % {"scope": self.scope, "ident": ident}
 
 
+# (tokens, last_replenished_at, accepted requests not yet written to the shared history) per throttle cache key
+# an idle bucket is full again after the rate's duration,
+# so expiring it after the longest duration DRF supports (a day) is equivalent to keeping it
+_local_token_buckets: TTLCache[str, tuple[float, float, int]] = TTLCache(maxsize=10_000, ttl=24 * 60 * 60)
+_local_token_buckets_lock = threading.Lock()
+
+
+class LocalTokenBucketPersonalApiKeyRateThrottle(PersonalApiKeyRateThrottle):
+    """
+    A PersonalApiKeyRateThrottle for high volume endpoints.
+
+    DRF's SimpleRateThrottle reads and writes the request history in the Django cache on every request.
+    This throttle keeps an in-process token bucket per personal API key instead,
+    and only every `sync_every` accepted requests writes them to the shared (cache backed) history,
+    and checks it, so that the limit still applies across processes.
+    In exchange each process can over-allow by up to `sync_every` requests.
+
+    Requests that are not made with a personal API key use the shared history on every request, as usual.
+    """
+
+    sync_every = 10
+    # set when the local bucket denies the request, the shared history then says nothing about how long to wait
+    local_wait: float | None = None
+
+    def request_would_be_allowed(self, request, view, personal_api_key: Optional[tuple[str, str]]) -> bool:
+        self.local_wait = None
+        if personal_api_key is None or not request.user.is_authenticated:
+            return super().request_would_be_allowed(request, view, personal_api_key)
+
+        # what get_cache_key works out for a personal API key, without looking for the key in the request again
+        self.key = self.cache_format % {"scope": self.scope, "ident": hash_key_value(personal_api_key[0])}
+        self.now = self.timer()
+        self.history = []
+        replenish_rate = self.num_requests / self.duration
+        with _local_token_buckets_lock:
+            tokens, last_replenished_at, unsynced = _local_token_buckets.get(self.key, (self.num_requests, self.now, 0))
+            tokens = min(self.num_requests, tokens + (self.now - last_replenished_at) * replenish_rate)
+            if tokens < 1:
+                _local_token_buckets[self.key] = (tokens, self.now, unsynced)
+                self.local_wait = (1 - tokens) / replenish_rate
+                return False
+
+            unsynced += 1
+            needs_sync = unsynced >= self.sync_every
+            _local_token_buckets[self.key] = (tokens - 1, self.now, 0 if needs_sync else unsynced)
+
+        if needs_sync:
+            return self.sync_shared_history(unsynced)
+        return True
+
+    def sync_shared_history(self, accepted_requests: int) -> bool:
+        self.history = self.cache.get(self.key, [])
+        while self.history and self.history[-1] <= self.now - self.duration:
+            self.history.pop()
+
+        # other processes may have already used the allowance
+        allowed = len(self.history) < self.num_requests
+        if not allowed:
+            # this request is denied, but the ones before it were accepted locally and still have to be counted
+            accepted_requests -= 1
+
+        if accepted_requests:
+            self.history = [self.now] * accepted_requests + self.history
+            self.cache.set(self.key, self.history, self.duration)
+        return allowed
+
+    def wait(self) -> float | None:
+        if self.local_wait is not None:
+            # the time until the local bucket has a token again
+            return self.local_wait
+        return super().wait()
+
+
+def clear_local_token_buckets() -> None:
+    with _local_token_buckets_lock:
+        _local_token_buckets.clear()
+
+
 class DecideRateThrottle(BaseThrottle):
     """
     This is a custom throttle that is used to limit the number of requests to the /decide endpoint.
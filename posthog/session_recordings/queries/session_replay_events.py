@@ -37,10 +37,13 @@ class SessionReplayEvents:
         )
 
         if existence:
-            # let's be cautious and not cache non-existence
-            # in case we manage to check existence just before the first event hits ClickHouse
-            # that should be impossible but cache invalidation is hard etc etc
             cache.set(cache_key, existence, timeout=seconds_until_midnight())
+        else:
+            # let's be cautious and only cache non-existence very briefly
+            # in case we manage to check existence just before the first event hits ClickHouse
+            # but the client follows a sources request with snapshot requests within a few seconds,
+            # and they don't each need to go to ClickHouse to be told no
+            cache.set(cache_key, existence, timeout=5)
         return existence
 
     @staticmethod
@@ -1,3 +1,7 @@
+from unittest.mock import patch
+
+from freezegun import freeze_time
+
 from posthog.models import Team
 from posthog.session_recordings.queries.session_replay_events import SessionReplayEvents
 from posthog.session_recordings.queries.test.session_replay_sql import (
@@ -71,3 +75,32 @@ class SessionReplayEventsQueries(ClickhouseTestMixin, APIBaseTest):
             recording_start_time=self.base_time + relativedelta(days=2),
         )
         assert metadata is None
+
+    def test_non_existence_is_only_cached_briefly(self) -> None:
+        with (
+            freeze_time(now()) as frozen_time,
+            patch.object(
+                SessionReplayEvents,
+                "_check_exists_within_days",
+                wraps=SessionReplayEvents._check_exists_within_days,
+            ) as check_exists,
+        ):
+            assert not SessionReplayEvents().exists(session_id="late", team=self.team)
+            # checked within the team's TTL and then within the maximum retention
+            assert check_exists.call_count == 2
+
+            produce_replay_summary(
+                session_id="late",
+                team_id=self.team.pk,
+                first_timestamp=self.base_time.isoformat(),
+                last_timestamp=self.base_time.isoformat(),
+                distinct_id="u1",
+            )
+
+            # the cached answer is used, even though the session exists now
+            assert not SessionReplayEvents().exists(session_id="late", team=self.team)
+            assert check_exists.call_count == 2
+
+            frozen_time.tick(6)
+            assert SessionReplayEvents().exists(session_id="late", team=self.team)
+            assert check_exists.call_count == 3
@@ -1,8 +1,10 @@
 import json
-from time import sleep
+import threading
+from time import monotonic, sleep
 from typing import Optional
 
 import structlog
+from cachetools import TTLCache
 from prometheus_client import Counter, Histogram
 
 from posthog import settings
@@ -33,6 +35,16 @@ REALTIME_SUBSCRIPTIONS_DATA_LENGTH = Histogram(
 
 SUBSCRIPTION_CHANNEL = "@posthog/replay/realtime-subscriptions"
 
+# while a session is being watched the UI polls for sources,
+# we only need to (re-)publish the subscription every so often, not on every poll
+SUBSCRIPTION_PUBLISH_RATE_PER_SECOND = 0.1
+SUBSCRIPTION_PUBLISH_BURST = 2
+
+# (tokens, last_refilled_at) per (team_id, session_id)
+# an idle bucket is full again after BURST / RATE seconds, so expiring it later than that is equivalent to keeping it
+_subscription_publish_buckets: TTLCache[tuple[str, str], tuple[float, float]] = TTLCache(maxsize=10_000, ttl=60)
+_subscription_publish_buckets_lock = threading.Lock()
+
 
 def get_key(team_id: str, suffix: str) -> str:
     return f"@posthog/replay/snapshots/team-{team_id}/{suffix}"
@@ -61,6 +73,31 @@ def publish_subscription(team_id: str, session_id: str) -> None:
         raise
 
 
+def _subscription_publish_allowed(team_id: str, session_id: str) -> bool:
+    key = (team_id, session_id)
+    now = monotonic()
+    with _subscription_publish_buckets_lock:
+        tokens, last_refilled_at = _subscription_publish_buckets.get(key, (SUBSCRIPTION_PUBLISH_BURST, now))
+        tokens = min(
+            SUBSCRIPTION_PUBLISH_BURST, tokens + (now - last_refilled_at) * SUBSCRIPTION_PUBLISH_RATE_PER_SECOND
+        )
+        allowed = tokens >= 1
+        _subscription_publish_buckets[key] = (tokens - 1 if allowed else tokens, now)
+    return allowed
+
+
+def maybe_publish_subscription(team_id: str, session_id: str) -> bool:
+    """
+    Publishing is idempotent, so for a session that is being polled
+    we rate limit (per process) how often we hit Redis with the same subscription
+    """
+    if not _subscription_publish_allowed(team_id, session_id):
+        return False
+
+    publish_subscription(team_id, session_id)
+    return True
+
+
 def get_realtime_snapshots(team_id: str, session_id: str, attempt_count=0) -> Optional[list[str]]:
     try:
         redis = get_client(settings.SESSION_RECORDING_REDIS_URL)
@@ -1,26 +1,35 @@
 import json
 import os
 import re
+import threading
 import time
-from collections.abc import Generator
-from contextlib import contextmanager
+from collections import deque
+from collections.abc import Callable, Generator, Iterator
+from contextlib import ExitStack, contextmanager
 from datetime import UTC, datetime, timedelta
-from json import JSONDecodeError
+from functools import lru_cache
 from typing import Any, Optional, cast, Literal
 
+import orjson
+from cachetools import TTLCache, cached
 from posthoganalytics.ai.openai import OpenAI
 from urllib.parse import urlparse, parse_qs
 
 import posthoganalytics
+from posthoganalytics.client import Client as PostHogClient
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
+from django.contrib.postgres.aggregates import ArrayAgg
 from django.core.cache import cache
-from django.http import HttpResponse, JsonResponse
+from django.db.models import Count, Q
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from drf_spectacular.utils import extend_schema
 from prometheus_client import Counter, Histogram
 from pydantic import ValidationError, BaseModel
-from rest_framework import exceptions, request, serializers, viewsets
+from rest_framework import exceptions, request, serializers, status, viewsets
 from rest_framework.mixins import UpdateModelMixin
 from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
@@ -40,8 +49,9 @@ from posthog.models.person.person import PersonDistinctId
 from posthog.rate_limit import (
     ClickHouseBurstRateThrottle,
     ClickHouseSustainedRateThrottle,
-    PersonalApiKeyRateThrottle,
+    LocalTokenBucketPersonalApiKeyRateThrottle,
 )
+from posthog.renderers import SafeJSONRenderer
 from posthog.schema import HogQLQueryModifiers, PropertyFilterType, QueryTiming, RecordingsQuery
 from posthog.session_recordings.models.session_recording import SessionRecording
 from posthog.session_recordings.models.session_recording_event import (
@@ -52,12 +62,13 @@ from posthog.session_recordings.queries.session_replay_events import SessionRepl
 from posthog.session_recordings.queries.session_replay_events_v2_test import SessionReplayEventsV2Test
 from posthog.session_recordings.realtime_snapshots import (
     get_realtime_snapshots,
-    publish_subscription,
+    maybe_publish_subscription,
 )
 from posthog.storage import object_storage, session_recording_v2_object_storage
 from posthog.session_recordings.ai_data.ai_regex_schema import AiRegexSchema
 from posthog.session_recordings.ai_data.ai_regex_prompts import AI_REGEX_PROMPTS
 from posthog.settings.session_replay import SESSION_REPLAY_AI_REGEX_MODEL
+from openai import APITimeoutError
 from openai.types.chat import (
     ChatCompletionMessageParam,
     ChatCompletionSystemMessageParam,
@@ -66,6 +77,9 @@ from openai.types.chat import (
 )
 from posthog.session_recordings.utils import clean_prompt_whitespace
 import snappy
+import structlog
+
+logger = structlog.get_logger(__name__)
 
 SNAPSHOTS_BY_PERSONAL_API_KEY_COUNTER = Counter(
     "snapshots_personal_api_key_counter",
@@ -95,6 +109,15 @@ STREAM_RESPONSE_TO_CLIENT_HISTOGRAM = Histogram(
 )
 
 
+@lru_cache(maxsize=1024)
+def _validate_recordings_query(canonical_query: bytes) -> RecordingsQuery:
+    """
+    The UI polls the list endpoint with the same filters over and over,
+    so we cache validation by the (key sorted) JSON of the params
+    """
+    return RecordingsQuery.model_validate(orjson.loads(canonical_query))
+
+
 def filter_from_params_to_query(params: dict) -> RecordingsQuery:
     data_dict = query_as_params_to_dict(params)
     # we used to send `version` and it's not part of query, so we pop to make sure
@@ -103,7 +126,9 @@ def filter_from_params_to_query(params: dict) -> RecordingsQuery:
     data_dict.pop("hogql_filtering", None)
 
     try:
-        return RecordingsQuery.model_validate(data_dict)
+        # callers change the query (e.g. appending test account filters to its properties in place),
+        # so they must not share the cached instance or anything nested in it
+        return _validate_recordings_query(orjson.dumps(data_dict, option=orjson.OPT_SORT_KEYS)).model_copy(deep=True)
     except ValidationError as pydantic_validation_error:
         raise exceptions.ValidationError(json.dumps(pydantic_validation_error.errors()))
 
@@ -136,35 +161,163 @@ class SurrogatePairSafeJSONRenderer(JSONRenderer):
 
     This JSON renderer ensures that the stringified JSON does not have any unescaped surrogate pairs.
 
-    Because it has to override the encoder, it can't use orjson.
+    orjson refuses to encode lone surrogates, so anything it can encode is already safe,
+    and only payloads it rejects fall back to the (slower) surrogate escaping encoder.
     """
 
     encoder_class = SurrogatePairSafeJSONEncoder
 
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        if data is None:
+            return b""
+
+        try:
+            return orjson.dumps(data, default=JSONEncoder().default)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+# the completion holds one of the few request threads of a worker for as long as openai takes,
+# and the SDK's default timeout is 10 minutes per attempt, so cap each attempt well below that.
+# the SDK still retries failed attempts as usual
+AI_COMPLETION_TIMEOUT_SECONDS = 30
+
+
+class AiCompletionTimeout(exceptions.APIException):
+    status_code = status.HTTP_504_GATEWAY_TIMEOUT
+    default_detail = "OpenAI took too long to respond, please try again."
+    default_code = "ai_completion_timeout"
+
+
+# the prompt is a constant, so it only needs its whitespace cleaned once
+AI_REGEX_SYSTEM_CONTENT = clean_prompt_whitespace(AI_REGEX_PROMPTS)
+
+REALTIME_SNAPSHOTS_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def _load_realtime_snapshot(line: str) -> Any:
+    try:
+        return orjson.loads(line)
+    except orjson.JSONDecodeError:
+        # orjson rejects lone surrogates, which the stdlib parser will accept
+        return json.loads(line)
+
+
+def stream_realtime_snapshots_as_json(snapshot_lines: list[str]) -> Generator[bytes, None, None]:
+    """
+    Streams `{"snapshots": [...]}` in roughly chunk sized pieces,
+    so we never hold more than one chunk of the encoded response in memory.
+    Each snapshot is encoded separately, so only snapshots that contain surrogates need the slow path
+    """
+    renderer = SurrogatePairSafeJSONRenderer()
+    buffer = bytearray(b'{"snapshots":[')
+    for i, line in enumerate(snapshot_lines):
+        if i:
+            buffer += b","
+        buffer += renderer.render(_load_realtime_snapshot(line))
+        if len(buffer) >= REALTIME_SNAPSHOTS_STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    buffer += b"]}"
+    yield bytes(buffer)
+
+
+def stream_realtime_snapshots_as_jsonl(snapshot_lines: list[str]) -> Generator[bytes, None, None]:
+    """
+    Streams the snapshot lines as jsonl in roughly chunk sized pieces,
+    rather than joining every line into one string before sending it
+    """
+    buffer = bytearray()
+    for i, line in enumerate(snapshot_lines):
+        if i:
+            buffer += b"\n"
+        buffer += line.encode("utf-8")
+        if len(buffer) >= REALTIME_SNAPSHOTS_STREAM_CHUNK_SIZE:
+            yield bytes(buffer)
+            buffer.clear()
+    if buffer:
+        yield bytes(buffer)
+
 
 # context manager for gathering a sequence of server timings
 class ServerTimingsGathered:
     def __init__(self):
-        # Instance level dictionary to store timings
-        self.timings_dict = {}
+        # Instance level dictionary to store timings, in nanoseconds
+        self.timings_dict: dict[str, int] = {}
+        # a stack of (name, start) so that nested timers don't clobber each other
+        self._started: list[tuple[str, int]] = []
 
     def __call__(self, name):
         self.name = name
         return self
 
     def __enter__(self):
-        # timings are assumed to be in milliseconds when reported
-        # but are gathered by time.perf_counter which is fractional seconds 🫠
-        # so each value is multiplied by 1000 at collection
-        self.start_time = time.perf_counter() * 1000
+        self._started.append((self.name, time.perf_counter_ns()))
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        end_time = time.perf_counter() * 1000
-        elapsed_time = end_time - self.start_time
-        self.timings_dict[self.name] = elapsed_time
+        name, start_ns = self._started.pop()
+        self.timings_dict[name] = time.perf_counter_ns() - start_ns
+
+    def get_all_timings(self) -> dict[str, float]:
+        # timings are assumed to be in milliseconds when reported
+        return {name: elapsed_ns / 1_000_000 for name, elapsed_ns in self.timings_dict.items()}
 
-    def get_all_timings(self):
-        return self.timings_dict
+
+def server_timing_header(timings: dict[str, float]) -> str:
+    # formatting to two decimals directly avoids creating an intermediate rounded float per timing
+    return ", ".join([f"{key};dur={duration:.2f}" for key, duration in timings.items()])
+
+
+def _int_or_none(value: Optional[int]) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+class SessionRecordingListSerializer(serializers.ListSerializer):
+    """
+    Renders a list of recordings in a single pass, reading attributes directly
+    instead of dispatching through a field object per attribute per recording.
+    Output must match SessionRecordingSerializer field for field.
+    """
+
+    def to_representation(self, data):
+        fields = self.child.fields
+        start_time_field = fields["start_time"]
+        end_time_field = fields["end_time"]
+        person_field = fields["person"]
+
+        results = []
+        for recording in data:
+            person = recording.person
+            start_time = recording.start_time
+            end_time = recording.end_time
+            results.append(
+                {
+                    "id": str(recording.session_id),
+                    "distinct_id": None if recording.distinct_id is None else str(recording.distinct_id),
+                    # viewed, viewers, ongoing and activity_score are custom fields merged into the model
+                    "viewed": getattr(recording, "viewed", False),
+                    "viewers": getattr(recording, "viewers", []),
+                    "recording_duration": _int_or_none(recording.duration),
+                    "active_seconds": _int_or_none(recording.active_seconds),
+                    "inactive_seconds": _int_or_none(recording.inactive_seconds),
+                    "start_time": None if start_time is None else start_time_field.to_representation(start_time),
+                    "end_time": None if end_time is None else end_time_field.to_representation(end_time),
+                    "click_count": _int_or_none(recording.click_count),
+                    "keypress_count": _int_or_none(recording.keypress_count),
+                    "mouse_activity_count": _int_or_none(recording.mouse_activity_count),
+                    "console_log_count": _int_or_none(recording.console_log_count),
+                    "console_warn_count": _int_or_none(recording.console_warn_count),
+                    "console_error_count": _int_or_none(recording.console_error_count),
+                    "start_url": None if recording.start_url is None else str(recording.start_url),
+                    "person": None if person is None else person_field.to_representation(person),
+                    "storage": recording.storage,
+                    "snapshot_source": recording.snapshot_source,
+                    "ongoing": getattr(recording, "ongoing", False),
+                    "activity_score": getattr(recording, "activity_score", None),
+                }
+            )
+
+        return results
 
 
 class SessionRecordingSerializer(serializers.ModelSerializer):
@@ -193,6 +346,7 @@ class SessionRecordingSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = SessionRecording
+        list_serializer_class = SessionRecordingListSerializer
         fields = [
             "id",
             "distinct_id",
@@ -285,20 +439,24 @@ class SessionRecordingUpdateSerializer(serializers.Serializer):
         return data
 
 
+_list_recordings_renderer = SafeJSONRenderer()
+
+
 def list_recordings_response(
     listing_result: tuple[list[SessionRecording], bool, dict], context: dict[str, Any]
-) -> Response:
+) -> HttpResponse:
     (recordings, more_recordings_available, timings) = listing_result
 
     session_recording_serializer = SessionRecordingSerializer(recordings, context=context, many=True)
     results = session_recording_serializer.data
 
-    response = Response(
-        {"results": results, "has_next": more_recordings_available, "version": 4},
-    )
-    response.headers["Server-Timing"] = ", ".join(
-        f"{key};dur={round(duration, ndigits=2)}" for key, duration in timings.items()
+    # the listing is only ever rendered as JSON, so we render it ourselves
+    # rather than paying for DRF's content negotiation and response rendering
+    response = HttpResponse(
+        _list_recordings_renderer.render({"results": results, "has_next": more_recordings_available, "version": 4}),
+        content_type="application/json",
     )
+    response.headers["Server-Timing"] = server_timing_header(timings)
     return response
 
 
@@ -313,6 +471,42 @@ def ensure_not_weak(etag: str) -> str:
     return etag
 
 
+def _build_blob_session() -> requests.Session:
+    session = requests.Session()
+    # keep connections to object storage alive between requests, so we don't pay for a TLS handshake every time
+    adapter = HTTPAdapter(pool_connections=32, pool_maxsize=64, max_retries=Retry(total=2, backoff_factor=0.1))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+_blob_session = _build_blob_session()
+
+
+# matches how long we let the browser cache a blob for
+BLOB_ETAG_CACHE_TIMEOUT_SECONDS = 3600
+
+# large enough that streaming a blob doesn't take a syscall per few kilobytes
+BLOB_STREAM_CHUNK_SIZE = 256 * 1024
+
+
+class ClosingIterator:
+    """
+    Wraps an iterator with a close callback.
+    Django calls `close` on streaming content once the response has been sent, even if it was never iterated
+    """
+
+    def __init__(self, iterator: Iterator[bytes], close: Callable[[], None]):
+        self._iterator = iterator
+        self._close = close
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self._iterator
+
+    def close(self) -> None:
+        self._close()
+
+
 @contextmanager
 def stream_from(url: str, headers: dict | None = None) -> Generator[requests.Response, None, None]:
     """
@@ -326,64 +520,134 @@ def stream_from(url: str, headers: dict | None = None) -> Generator[requests.Res
     if headers is None:
         headers = {}
 
-    session = requests.Session()
-
+    response = _blob_session.get(url, headers=headers, stream=True)
     try:
-        response = session.get(url, headers=headers, stream=True)
         yield response
     finally:
-        session.close()
+        # only the response is closed, the session is shared so its connections can be re-used
+        response.close()
 
 
-class SnapshotsBurstRateThrottle(PersonalApiKeyRateThrottle):
+class BucketTimeAccessCounter:
+    """
+    Counts accesses per key over a sliding window made of fixed length time buckets.
+    Buckets are rotated lazily when they are accessed, and only `bucket_count` are ever kept,
+    so memory is bounded by the number of keys seen within the window
+    """
+
+    def __init__(self, bucket_seconds: int = 60, bucket_count: int = 5) -> None:
+        self._bucket_seconds = bucket_seconds
+        self._bucket_count = bucket_count
+        self._buckets: deque[tuple[int, dict[str, int]]] = deque(maxlen=bucket_count)
+        self._lock = threading.Lock()
+
+    def increment(self, key: str) -> int:
+        """records an access and returns how many times the key had been accessed within the window before this"""
+        current_bucket = int(time.monotonic() // self._bucket_seconds)
+        oldest_bucket = current_bucket - self._bucket_count + 1
+        with self._lock:
+            if not self._buckets or self._buckets[-1][0] != current_bucket:
+                self._buckets.append((current_bucket, {}))
+
+            previous_accesses = sum(counts.get(key, 0) for bucket, counts in self._buckets if bucket >= oldest_bucket)
+            current_counts = self._buckets[-1][1]
+            current_counts[key] = current_counts.get(key, 0) + 1
+            return previous_accesses
+
+
+# sessions that are being played back are asked for their sources repeatedly,
+# those are worth caching, otherwise we'd fill the cache with listings that are only ever read once.
+# only persisted (LTS) recordings can be listed through here, their blobs never change,
+# whereas the ingestion path gains blobs while the session is live and a cached listing would hide them
+_blob_listing_access_counter = BucketTimeAccessCounter()
+HOT_BLOB_LISTING_THRESHOLD = 3
+BLOB_LISTING_CACHE_TIMEOUT_SECONDS = 30
+
+
+def list_blob_keys(blob_prefix: str) -> list[str] | None:
+    if _blob_listing_access_counter.increment(blob_prefix) < HOT_BLOB_LISTING_THRESHOLD:
+        return object_storage.list_objects(blob_prefix)
+
+    return cache.get_or_set(
+        f"session_recording_blob_keys_{blob_prefix}",
+        lambda: object_storage.list_objects(blob_prefix),
+        timeout=BLOB_LISTING_CACHE_TIMEOUT_SECONDS,
+    )
+
+
+class SnapshotsBurstRateThrottle(LocalTokenBucketPersonalApiKeyRateThrottle):
     scope = "snapshots_burst"
     rate = "120/minute"
 
 
-class SnapshotsSustainedRateThrottle(PersonalApiKeyRateThrottle):
+class SnapshotsSustainedRateThrottle(LocalTokenBucketPersonalApiKeyRateThrottle):
     scope = "snapshots_sustained"
     rate = "600/hour"
 
 
+# blob keys hold millisecond timestamps, adding them to the epoch avoids a float division and a timestamp conversion
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+_DIGITS_AND_DASHES_REMOVED = str.maketrans("", "", "0123456789-")
+
+_JSON_VALUE_START_CHARS = frozenset('{["-0123456789tfn')
+
+# orjson only parses integers that fit in 64 bits, anything longer comes back as a lossy float
+_MAYBE_TOO_LONG_FOR_ORJSON_INTEGER = re.compile(r"\d{19,}")
+
+
+def _loads_query_param(value: str) -> Any:
+    if _MAYBE_TOO_LONG_FOR_ORJSON_INTEGER.search(value):
+        return json.loads(value)
+    return orjson.loads(value)
+
+
 def query_as_params_to_dict(params_dict: dict) -> dict:
     """
     before (if ever) we convert this to a query runner that takes a post
     we need to convert to a valid dict from the data that arrived in query params
     """
     converted = {}
-    for key in params_dict:
-        try:
-            converted[key] = json.loads(params_dict[key]) if isinstance(params_dict[key], str) else params_dict[key]
-        except JSONDecodeError:
-            converted[key] = params_dict[key]
+    for key, value in params_dict.items():
+        # most params are bare strings like `blob` that can't be JSON,
+        # so we only pay for a parse attempt (and a raised exception) when it could be
+        if isinstance(value, str) and value and value[0] in _JSON_VALUE_START_CHARS:
+            try:
+                converted[key] = _loads_query_param(value)
+            except json.JSONDecodeError:
+                # orjson's decode error is a subclass of this one
+                converted[key] = value
+        else:
+            converted[key] = value
 
     converted.pop("as_query", None)
 
     return converted
 
 
+# applied in order, e.g. the project prefix has to be removed before the other patterns can match
+_REFERER_PATH_REPLACEMENTS: tuple[tuple[re.Pattern[str], str], ...] = (
+    (re.compile(r"^/?project/\d+"), ""),
+    (re.compile(r"^/?person/.*$"), "person-page"),
+    (re.compile(r"^/?insights/[^/]+/edit$"), "insight-edit"),
+    (re.compile(r"^/?insights/[^/]+$"), "insight"),
+    (re.compile(r"^/?data-management/events/[^/]+$"), "data-management-events"),
+    (re.compile(r"^/?data-management/actions/[^/]+$"), "data-management-actions"),
+    (re.compile(r"^/?replay/[a-fA-F0-9-]+$"), "replay-direct"),
+    (re.compile(r"^/?replay/playlists/.+$"), "replay-playlists-direct"),
+)
+
+
 def clean_referer_url(current_url: str | None) -> str:
     try:
         parsed_url = urlparse(current_url)
         path = str(parsed_url.path) if parsed_url.path else "unknown"
 
-        path = re.sub(r"^/?project/\d+", "", path)
-
-        path = re.sub(r"^/?person/.*$", "person-page", path)
-
-        path = re.sub(r"^/?insights/[^/]+/edit$", "insight-edit", path)
-
-        path = re.sub(r"^/?insights/[^/]+$", "insight", path)
-
-        path = re.sub(r"^/?data-management/events/[^/]+$", "data-management-events", path)
-        path = re.sub(r"^/?data-management/actions/[^/]+$", "data-management-actions", path)
-
-        path = re.sub(r"^/?replay/[a-fA-F0-9-]+$", "replay-direct", path)
-        path = re.sub(r"^/?replay/playlists/.+$", "replay-playlists-direct", path)
+        for pattern, replacement in _REFERER_PATH_REPLACEMENTS:
+            path = pattern.sub(replacement, path)
 
         # remove leading and trailing slashes
-        path = re.sub(r"^/+|/+$", "", path)
-        path = re.sub("/", "-", path)
+        path = path.strip("/").replace("/", "-")
         return path or "unknown"
     except Exception as e:
         posthoganalytics.capture_exception(e, distinct_id="clean_referer_url", properties={"current_url": current_url})
@@ -415,7 +679,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
 
         return recording
 
-    def list(self, request: request.Request, *args: Any, **kwargs: Any) -> Response:
+    def list(self, request: request.Request, *args: Any, **kwargs: Any) -> HttpResponse:
         query = filter_from_params_to_query(request.GET.dict())
 
         self._maybe_report_recording_list_filters_changed(request, team=self.team)
@@ -433,7 +697,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         This API is intended for internal use and might have unannounced breaking changes.""",
     )
     @action(methods=["GET"], detail=False)
-    def matching_events(self, request: request.Request, *args: Any, **kwargs: Any) -> JsonResponse:
+    def matching_events(self, request: request.Request, *args: Any, **kwargs: Any) -> Response:
         data_dict = query_as_params_to_dict(request.GET.dict())
         query = RecordingsQuery.model_validate(data_dict)
 
@@ -459,12 +723,10 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             ).get_event_ids_for_session()
         )
 
-        response = JsonResponse(data={"results": results})
+        # a DRF response is rendered by the (orjson based) default renderer, JsonResponse would use stdlib json
+        response = Response(data={"results": results})
 
-        response.headers["Server-Timing"] = ", ".join(
-            f"{key};dur={round(duration, ndigits=2)}"
-            for key, duration in _generate_timings(timings, ServerTimingsGathered()).items()
-        )
+        response.headers["Server-Timing"] = server_timing_header(_generate_timings(timings, ServerTimingsGathered()))
         return response
 
     @extend_schema(
@@ -474,17 +736,17 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         """,
     )
     @action(methods=["GET"], detail=True)
-    def viewed(self, request: request.Request, *args: Any, **kwargs: Any) -> JsonResponse:
+    def viewed(self, request: request.Request, *args: Any, **kwargs: Any) -> Response:
         recording: SessionRecording = self.get_object()
 
         if not request.user.is_anonymous:
-            viewed = current_user_viewed([str(recording.session_id)], cast(User, request.user), self.team)
-            other_viewers = _other_users_viewed([str(recording.session_id)], cast(User, request.user), self.team)
+            session_id = str(recording.session_id)
+            viewed, other_viewers = bulk_load_viewed([session_id], cast(User, request.user), self.team)
 
-            recording.viewed = str(recording.session_id) in viewed
-            recording.viewers = other_viewers.get(str(recording.session_id), [])
+            recording.viewed = session_id in viewed
+            recording.viewers = other_viewers.get(session_id, [])
 
-        return JsonResponse({"viewed": recording.viewed, "other_viewers": len(recording.viewers or [])})
+        return Response({"viewed": recording.viewed, "other_viewers": len(recording.viewers or [])})
 
     # Returns metadata about the recording
     def retrieve(self, request: request.Request, *args: Any, **kwargs: Any) -> Response:
@@ -497,11 +759,11 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
 
         recording.load_person()
         if not request.user.is_anonymous:
-            viewed = current_user_viewed([str(recording.session_id)], cast(User, request.user), self.team)
-            other_viewers = _other_users_viewed([str(recording.session_id)], cast(User, request.user), self.team)
+            session_id = str(recording.session_id)
+            viewed, other_viewers = bulk_load_viewed([session_id], cast(User, request.user), self.team)
 
-            recording.viewed = str(recording.session_id) in viewed
-            recording.viewers = other_viewers.get(str(recording.session_id), [])
+            recording.viewed = session_id in viewed
+            recording.viewers = other_viewers.get(session_id, [])
 
         serializer = self.get_serializer(recording)
 
@@ -612,8 +874,9 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         """
 
         recording = self.get_object()
+        session_id = str(recording.session_id)
 
-        if not SessionReplayEvents().exists(session_id=str(recording.session_id), team=self.team):
+        if not SessionReplayEvents().exists(session_id=session_id, team=self.team):
             raise exceptions.NotFound("Recording not found")
 
         source = request.GET.get("source")
@@ -621,7 +884,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         event_properties = {
             "team_id": self.team.pk,
             "request_source": source,
-            "session_being_loaded": recording.session_id,
+            "session_being_loaded": session_id,
         }
 
         if request.headers.get("X-POSTHOG-SESSION-ID"):
@@ -636,9 +899,11 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         if source:
             SNAPSHOT_SOURCE_REQUESTED.labels(source=source).inc()
 
-        personal_api_key = PersonalAPIKeyAuthentication.find_key_with_source(request)
-        if personal_api_key:
-            SNAPSHOTS_BY_PERSONAL_API_KEY_COUNTER.labels(api_key=personal_api_key, source=source).inc()
+        # most requests come from the app with a session cookie, so only look for a key when one was used
+        if isinstance(request.successful_authenticator, PersonalAPIKeyAuthentication):
+            personal_api_key = PersonalAPIKeyAuthentication.find_key_with_source(request)
+            if personal_api_key:
+                SNAPSHOTS_BY_PERSONAL_API_KEY_COUNTER.labels(api_key=personal_api_key, source=source).inc()
 
         is_v2_enabled = posthoganalytics.feature_enabled(
             "recordings-blobby-v2-replay",
@@ -670,7 +935,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         """
         user_modified_filters = request.GET.get("user_modified_filters")
         if user_modified_filters:
-            user_modified_filters_obj = json.loads(user_modified_filters)
+            user_modified_filters_obj = orjson.loads(user_modified_filters)
             partial_filters = {
                 f"partial_filter_chosen_{key}": value for key, value in user_modified_filters_obj.items()
             }
@@ -689,11 +954,17 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         newest_timestamp = None
         response_data = {}
         sources: list[dict] = []
+        # sources are gathered as parallel lists, and only built into dicts once they're in order
+        source_types: list[str] = []
+        start_timestamps: list[datetime] = []
+        end_timestamps: list[datetime] = []
+        source_blob_keys: list[str] = []
         blob_keys: list[str] | None = None
         blob_prefix = ""
+        session_id = str(recording.session_id)
 
         if is_v2_enabled:
-            v2_metadata = SessionReplayEventsV2Test().get_metadata(str(recording.session_id), self.team)
+            v2_metadata = SessionReplayEventsV2Test().get_metadata(session_id, self.team)
             if v2_metadata:
                 blocks = sorted(
                     zip(
@@ -708,41 +979,43 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
                 if blocks and blocks[0][0] != v2_metadata["start_time"]:
                     blocks = []
                 for i, (start_timestamp, end_timestamp, _) in enumerate(blocks):
-                    sources.append(
-                        {
-                            "source": "blob_v2",
-                            "start_timestamp": start_timestamp,
-                            "end_timestamp": end_timestamp,
-                            "blob_key": str(i),
-                        }
-                    )
+                    source_types.append("blob_v2")
+                    start_timestamps.append(start_timestamp)
+                    end_timestamps.append(end_timestamp)
+                    source_blob_keys.append(str(i))
         if recording.object_storage_path:
             blob_prefix = recording.object_storage_path
-            blob_keys = object_storage.list_objects(cast(str, blob_prefix))
+            blob_keys = list_blob_keys(cast(str, blob_prefix))
             might_have_realtime = False
         else:
             blob_prefix = recording.build_blob_ingestion_storage_path()
             blob_keys = object_storage.list_objects(blob_prefix)
 
         if blob_keys:
+            key_prefix = blob_prefix.rstrip("/") + "/"
             for full_key in blob_keys:
                 # Keys are like 1619712000-1619712060
-                blob_key = full_key.replace(blob_prefix.rstrip("/") + "/", "")
-                blob_key_base = blob_key.split(".")[0]  # Remove the extension if it exists
-                time_range = [datetime.fromtimestamp(int(x) / 1000, tz=UTC) for x in blob_key_base.split("-")]
-
-                sources.append(
-                    {
-                        "source": "blob",
-                        "start_timestamp": time_range[0],
-                        "end_timestamp": time_range.pop(),
-                        "blob_key": blob_key,
-                    }
-                )
-        if sources:
-            sources = sorted(sources, key=lambda x: x["start_timestamp"])
-            oldest_timestamp = min(sources, key=lambda k: k["start_timestamp"])["start_timestamp"]
-            newest_timestamp = min(sources, key=lambda k: k["end_timestamp"])["end_timestamp"]
+                blob_key = full_key.removeprefix(key_prefix)
+                blob_key_base = blob_key.partition(".")[0]  # Remove the extension if it exists
+
+                source_types.append("blob")
+                start_timestamps.append(_EPOCH + timedelta(milliseconds=int(blob_key_base.partition("-")[0])))
+                end_timestamps.append(_EPOCH + timedelta(milliseconds=int(blob_key_base.rpartition("-")[2])))
+                source_blob_keys.append(blob_key)
+        if source_types:
+            # object storage lists keys in order, so this sort is (close to) linear
+            order = sorted(range(len(start_timestamps)), key=start_timestamps.__getitem__)
+            sources = [
+                {
+                    "source": source_types[i],
+                    "start_timestamp": start_timestamps[i],
+                    "end_timestamp": end_timestamps[i],
+                    "blob_key": source_blob_keys[i],
+                }
+                for i in order
+            ]
+            oldest_timestamp = start_timestamps[order[0]]
+            newest_timestamp = min(end_timestamps)
 
             if might_have_realtime:
                 might_have_realtime = oldest_timestamp + timedelta(hours=24) > datetime.now(UTC)
@@ -758,7 +1031,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             # so, we can publish the request for Mr. Blobby to start syncing to Redis now
             # it takes a short while for the subscription to be sync'd into redis
             # let's use the network round trip time to get started
-            publish_subscription(team_id=str(self.team.pk), session_id=str(recording.session_id))
+            maybe_publish_subscription(team_id=str(self.team.pk), session_id=session_id)
         response_data["sources"] = sources
         serializer = SessionRecordingSourcesSerializer(response_data)
         return Response(serializer.data)
@@ -772,7 +1045,13 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             raise exceptions.ValidationError("Invalid blob key: " + blob_key)
 
         # blob key should be a string of the form 1619712000-1619712060
-        if not all(x.isdigit() for x in blob_key.split("-")):
+        # so after removing digits and dashes nothing should be left, and no dash can be leading, trailing or doubled
+        if (
+            blob_key.translate(_DIGITS_AND_DASHES_REMOVED)
+            or blob_key[0] == "-"
+            or blob_key[-1] == "-"
+            or "--" in blob_key
+        ):
             raise exceptions.ValidationError("Invalid blob key: " + blob_key)
 
     @staticmethod
@@ -808,7 +1087,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         if not environment_is_allowed or not has_openai_api_key:
             raise exceptions.ValidationError("session summary is only supported in PostHog Cloud")
 
-        if not posthoganalytics.feature_enabled("ai-session-summary", str(user.distinct_id)):
+        if not session_summary_enabled(str(user.distinct_id)):
             raise exceptions.ValidationError("session summary is not enabled for this user")
 
         summary = summarize_recording(recording, user, self.team)
@@ -820,32 +1099,36 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         # let the browser cache for half the time we cache on the server
         r = Response(summary, headers={"Cache-Control": "max-age=15"})
         if timings:
-            r.headers["Server-Timing"] = ", ".join(
-                f"{key};dur={round(duration, ndigits=2)}" for key, duration in timings.items()
-            )
+            r.headers["Server-Timing"] = server_timing_header(timings)
         return r
 
     def _stream_blob_to_client(
         self, recording: SessionRecording, request: request.Request, event_properties: dict
-    ) -> HttpResponse:
+    ) -> HttpResponse | StreamingHttpResponse:
         blob_key = request.GET.get("blob_key", "")
         self._validate_blob_key(blob_key)
 
-        # very short-lived pre-signed URL
-        with GENERATE_PRE_SIGNED_URL_HISTOGRAM.time():
-            if recording.object_storage_path:
-                if recording.storage_version == "2023-08-01":
-                    file_key = f"{recording.object_storage_path}/{blob_key}"
-                else:
-                    raise NotImplementedError(
-                        f"Unknown session replay object storage version {recording.storage_version}"
-                    )
+        if recording.object_storage_path:
+            if recording.storage_version == "2023-08-01":
+                file_key = f"{recording.object_storage_path}/{blob_key}"
             else:
-                blob_prefix = settings.OBJECT_STORAGE_SESSION_RECORDING_BLOB_INGESTION_FOLDER
-                file_key = f"{recording.build_blob_ingestion_storage_path(root_prefix=blob_prefix)}/{blob_key}"
-            url = object_storage.get_presigned_url(file_key, expiration=60)
-            if not url:
-                raise exceptions.NotFound("Snapshot file not found")
+                raise NotImplementedError(f"Unknown session replay object storage version {recording.storage_version}")
+        else:
+            blob_prefix = settings.OBJECT_STORAGE_SESSION_RECORDING_BLOB_INGESTION_FOLDER
+            file_key = f"{recording.build_blob_ingestion_storage_path(root_prefix=blob_prefix)}/{blob_key}"
+
+        # blobs are immutable, so if we've already seen the e-tag the client has,
+        # we can tell it nothing has changed without going to object storage at all
+        if_none_match = request.headers.get("If-None-Match")
+        etag_cache_key = f"blob_etag:{file_key}"
+        not_modified = bool(if_none_match) and cache.get(etag_cache_key) == ensure_not_weak(if_none_match)
+
+        if not not_modified:
+            # very short-lived pre-signed URL
+            with GENERATE_PRE_SIGNED_URL_HISTOGRAM.time():
+                url = object_storage.get_presigned_url(file_key, expiration=60)
+                if not url:
+                    raise exceptions.NotFound("Snapshot file not found")
 
         event_properties["source"] = "blob"
         event_properties["blob_key"] = blob_key
@@ -855,43 +1138,59 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             event_properties,
         )
 
-        with STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.time():
-            # streams the file from S3 to the client
-            # will not decompress the possibly large file because of `stream=True`
-            #
-            # we pass some headers through to the client
-            # particularly we should signal the content-encoding
-            # to help the client know it needs to decompress
-            #
-            # if the client provides an e-tag we can use it to check if the file has changed
-            # object store will respect this and send back 304 if the file hasn't changed,
-            # and we don't need to send the large file over the wire
-
-            if_none_match = request.headers.get("If-None-Match")
-            headers = {}
-            if if_none_match:
-                headers["If-None-Match"] = ensure_not_weak(if_none_match)
-
-            with stream_from(url=url, headers=headers) as streaming_response:
-                streaming_response.raise_for_status()
-
-                response = HttpResponse(content=streaming_response.raw, status=streaming_response.status_code)
-
-                etag = streaming_response.headers.get("ETag")
-                if etag:
-                    response["ETag"] = ensure_not_weak(etag)
-
-                # blobs are immutable, _really_ we can cache forever
-                # but let's cache for an hour since people won't re-watch too often
-                # we're setting cache control and ETag which might be considered overkill,
-                # but it helps avoid network latency from the client to PostHog, then to object storage, and back again
-                # when a client has a fresh copy
-                response["Cache-Control"] = streaming_response.headers.get("Cache-Control") or "max-age=3600"
-
-                response["Content-Type"] = "application/json"
-                response["Content-Disposition"] = "inline"
-
-                return response
+        if not_modified:
+            not_modified_response = HttpResponseNotModified()
+            not_modified_response["ETag"] = ensure_not_weak(cast(str, if_none_match))
+            return not_modified_response
+
+        # streams the file from S3 to the client
+        # will not decompress the possibly large file because of `stream=True`
+        #
+        # we pass some headers through to the client
+        # particularly we should signal the content-encoding
+        # to help the client know it needs to decompress
+        #
+        # if the client provides an e-tag we can use it to check if the file has changed
+        # object store will respect this and send back 304 if the file hasn't changed,
+        # and we don't need to send the large file over the wire
+
+        headers = {}
+        if if_none_match:
+            headers["If-None-Match"] = ensure_not_weak(if_none_match)
+
+        with ExitStack() as stack:
+            # the body is sent after we return, so the timer goes on the stack
+            # to only stop once the streaming response is closed
+            stack.enter_context(STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.time())
+            streaming_response = stack.enter_context(stream_from(url=url, headers=headers))
+            streaming_response.raise_for_status()
+
+            # the object storage response has to stay open until django has finished sending the body,
+            # so closing it is handed over to the streaming response
+            response = StreamingHttpResponse(
+                ClosingIterator(
+                    streaming_response.iter_content(chunk_size=BLOB_STREAM_CHUNK_SIZE),
+                    close=stack.pop_all().close,
+                ),
+                status=streaming_response.status_code,
+            )
+
+            etag = streaming_response.headers.get("ETag")
+            if etag:
+                response["ETag"] = ensure_not_weak(etag)
+                cache.set(etag_cache_key, response["ETag"], timeout=BLOB_ETAG_CACHE_TIMEOUT_SECONDS)
+
+            # blobs are immutable, _really_ we can cache forever
+            # but let's cache for an hour since people won't re-watch too often
+            # we're setting cache control and ETag which might be considered overkill,
+            # but it helps avoid network latency from the client to PostHog, then to object storage, and back again
+            # when a client has a fresh copy
+            response["Cache-Control"] = streaming_response.headers.get("Cache-Control") or "max-age=3600"
+
+            response["Content-Type"] = "application/json"
+            response["Content-Disposition"] = "inline"
+
+            return response
 
     def _stream_blob_v2_to_client(
         self, recording: SessionRecording, request: request.Request, event_properties: dict
@@ -977,7 +1276,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
 
     def _send_realtime_snapshots_to_client(
         self, recording: SessionRecording, request: request.Request, event_properties: dict
-    ) -> HttpResponse | Response:
+    ) -> StreamingHttpResponse:
         version = request.GET.get("version", "og")
 
         with GET_REALTIME_SNAPSHOTS_FROM_REDIS.time():
@@ -1003,12 +1302,13 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             # we keep doing this here for a little while
             # so that existing browser sessions, that don't know about the new format
             # can carry on working until the next refresh
-            serializer = SessionRecordingSourcesSerializer({"snapshots": [json.loads(s) for s in snapshot_lines]})
-            return Response(serializer.data)
+            return StreamingHttpResponse(
+                stream_realtime_snapshots_as_json(snapshot_lines),
+                content_type="application/json",
+            )
         elif version == "2024-04-30":
-            response = HttpResponse(
-                # convert list to a jsonl response
-                content=("\n".join(snapshot_lines)),
+            response = StreamingHttpResponse(
+                stream_realtime_snapshots_as_jsonl(snapshot_lines),
                 content_type="application/json",
             )
             # the browser is not allowed to cache this at all
@@ -1029,31 +1329,35 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             raise exceptions.ValidationError("Missing required field: regex")
 
         messages = create_openai_messages(
-            system_content=clean_prompt_whitespace(AI_REGEX_PROMPTS),
+            system_content=AI_REGEX_SYSTEM_CONTENT,
             user_content=clean_prompt_whitespace(request.data["regex"]),
         )
 
         client = _get_openai_client()
 
-        completion = client.beta.chat.completions.parse(
-            model=SESSION_REPLAY_AI_REGEX_MODEL,
-            messages=messages,
-            response_format=AiRegexSchema,
-            # need to type ignore before, this will be a WrappedParse
-            # but the type detection can't figure that out
-            posthog_distinct_id=self._distinct_id_from_request(request),  # type: ignore
-            posthog_properties={
-                "ai_product": "session_replay",
-                "ai_feature": "ai_regex",
-            },
-        )
+        try:
+            completion = client.beta.chat.completions.parse(
+                model=SESSION_REPLAY_AI_REGEX_MODEL,
+                messages=messages,
+                response_format=AiRegexSchema,
+                # need to type ignore before, this will be a WrappedParse
+                # but the type detection can't figure that out
+                posthog_distinct_id=self._distinct_id_from_request(request),  # type: ignore
+                posthog_properties={
+                    "ai_product": "session_replay",
+                    "ai_feature": "ai_regex",
+                },
+                timeout=AI_COMPLETION_TIMEOUT_SECONDS,
+            )
+        except APITimeoutError:
+            raise AiCompletionTimeout()
 
         if not completion.choices or not completion.choices[0].message.content:
             raise exceptions.ValidationError("Invalid response from OpenAI")
 
         try:
-            response_data = json.loads(completion.choices[0].message.content)
-        except JSONDecodeError:
+            response_data = orjson.loads(completion.choices[0].message.content)
+        except orjson.JSONDecodeError:
             raise exceptions.ValidationError("Invalid JSON response from OpenAI")
 
         return Response(response_data)
@@ -1067,13 +1371,14 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         if recording.deleted:
             raise exceptions.NotFound("Recording not found")
 
-        if not SessionReplayEvents().exists(session_id=str(recording.session_id), team=self.team):
+        session_id = str(recording.session_id)
+        if not SessionReplayEvents().exists(session_id=session_id, team=self.team):
             raise exceptions.NotFound("Recording not found")
 
         # Find recordings with similar event sequences using ClickHouse
         with timer("get_similar_recordings"):
             similar_recordings = SessionReplayEvents().get_similar_recordings(
-                session_id=str(recording.session_id), team=self.team, limit=10, similarity_range=0.9
+                session_id=session_id, team=self.team, limit=10, similarity_range=0.9
             )
 
         recordings = []
@@ -1091,9 +1396,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         response = Response(
             {"count": len(unviewed_recordings), "results": [rec.session_id for rec in unviewed_recordings]}
         )
-        response.headers["Server-Timing"] = ", ".join(
-            f"{key};dur={round(duration, ndigits=2)}" for key, duration in _generate_timings(None, timer).items()
-        )
+        response.headers["Server-Timing"] = server_timing_header(_generate_timings(None, timer))
         return response
 
 
@@ -1123,19 +1426,21 @@ def list_recordings_from_query(
     if all_session_ids:
         with timer("load_persisted_recordings"):
             # If we specify the session ids (like from pinned recordings) we can optimise by only going to Postgres
-            sorted_session_ids = sorted(all_session_ids)
-
+            # the order of the ids doesn't matter to postgres, the results are put in the requested order below
             persisted_recordings_queryset = SessionRecording.objects.filter(
-                team=team, session_id__in=sorted_session_ids
+                team=team, session_id__in=all_session_ids
             ).exclude(object_storage_path=None)
 
-            persisted_recordings = persisted_recordings_queryset.all()
+            persisted_recordings = list(persisted_recordings_queryset)
 
-            recordings = recordings + list(persisted_recordings)
+            recordings = recordings + persisted_recordings
 
-            remaining_session_ids = list(set(all_session_ids) - {x.session_id for x in persisted_recordings})
-            query.session_ids = remaining_session_ids
+            persisted_session_ids = {x.session_id for x in persisted_recordings}
+            # keeps the requested order, dict.fromkeys drops any repeated ids
+            query.session_ids = [x for x in dict.fromkeys(all_session_ids) if x not in persisted_session_ids]
 
+    # ClickHouse is only asked for the sessions that Postgres didn't have,
+    # so this load has to wait for the persisted recordings rather than run alongside it
     if (all_session_ids and query.session_ids) or not all_session_ids:
         modifiers = safely_read_modifiers_overrides(str(user.distinct_id), team) if user else None
 
@@ -1150,38 +1455,52 @@ def list_recordings_from_query(
 
             recordings = [x for x in recordings if not x.deleted]
 
-            # If we have specified session_ids we need to sort them by the order they were specified
-            if all_session_ids:
-                recordings = sorted(
-                    recordings,
-                    key=lambda x: cast(list[str], all_session_ids).index(x.session_id),
-                )
+    # If we have specified session_ids we need to sort them by the order they were specified,
+    # whether they all came from Postgres or some came from ClickHouse
+    if all_session_ids:
+        # rank each id by where it was first specified, so sorting doesn't search the list per recording
+        rank: dict[str, int] = {}
+        for i, session_id in enumerate(all_session_ids):
+            rank.setdefault(session_id, i)
+        recordings.sort(key=lambda x: rank[x.session_id])
 
     if user and not user.is_authenticated:  # for mypy
         raise exceptions.NotAuthenticated()
 
+    if not recordings:
+        # e.g. a filtered page past the end, there's nothing to decorate with viewers or persons
+        return recordings, more_recordings_available, _generate_timings(hogql_timings, timer)
+
     recording_ids_in_list: list[str] = [str(r.session_id) for r in recordings]
     # Update the viewed status for all loaded recordings
     with timer("load_viewed_recordings"):
-        viewed_session_recordings = current_user_viewed(recording_ids_in_list, user, team)
-
-    with timer("load_other_viewers_by_recording"):
-        other_viewers = _other_users_viewed(recording_ids_in_list, user, team)
+        viewed_session_recordings, other_viewers = bulk_load_viewed(recording_ids_in_list, user, team)
 
     with timer("load_persons"):
         # Get the related persons for all the recordings
-        distinct_ids = sorted([x.distinct_id for x in recordings if x.distinct_id])
-        person_distinct_ids = PersonDistinctId.objects.filter(distinct_id__in=distinct_ids, team=team).select_related(
-            "person"
+        # many recordings can share a distinct id, there's no need to ask for it more than once
+        distinct_ids = sorted({x.distinct_id for x in recordings if x.distinct_id})
+        person_distinct_ids = list(
+            PersonDistinctId.objects.filter(distinct_id__in=distinct_ids, team=team)
+            .select_related("person")
+            # only load what rendering the person needs
+            .only(
+                "distinct_id",
+                "person__id",
+                "person__uuid",
+                "person__team_id",
+                "person__properties",
+                "person__created_at",
+            )
         )
 
     with timer("process_persons"):
-        distinct_id_to_person = {}
+        distinct_id_to_person = {
+            person_distinct_id.distinct_id: person_distinct_id.person for person_distinct_id in person_distinct_ids
+        }
         for person_distinct_id in person_distinct_ids:
-            person_distinct_id.person._distinct_ids = [
-                person_distinct_id.distinct_id
-            ]  # Stop the person from loading all distinct ids
-            distinct_id_to_person[person_distinct_id.distinct_id] = person_distinct_id.person
+            # Stop the person from loading all distinct ids
+            person_distinct_id.person._distinct_ids = [person_distinct_id.distinct_id]
 
         for recording in recordings:
             recording.viewed = recording.session_id in viewed_session_recordings
@@ -1193,23 +1512,36 @@ def list_recordings_from_query(
     return recordings, more_recordings_available, _generate_timings(hogql_timings, timer)
 
 
-def _other_users_viewed(recording_ids_in_list: list[str], user: User | None, team: Team) -> dict[str, list[str]]:
+def bulk_load_viewed(
+    recording_ids_in_list: list[str], user: User | None, team: Team
+) -> tuple[set[str], dict[str, list[str]]]:
+    """
+    Loads which of the recordings the user has viewed, and who else has viewed each of them, in one query
+    """
     if not user:
-        return {}
+        return set(), {}
 
-    # we're looping in python
-    # but since we limit the number of session recordings in the results set
-    # it shouldn't be too bad
-    other_viewers: dict[str, list[str]] = {str(x): [] for x in recording_ids_in_list}
+    # one row per recording, with the viewers already gathered up by postgres
     queryset = (
         SessionRecordingViewed.objects.filter(team=team, session_id__in=recording_ids_in_list)
-        .exclude(user=user)
-        .values_list("session_id", "user__email")
+        .values("session_id")
+        .annotate(
+            viewed_by_user=Count("id", filter=Q(user=user)),
+            other_viewer_emails=ArrayAgg("user__email", filter=~Q(user=user), default=None),
+        )
+        .values_list("session_id", "viewed_by_user", "other_viewer_emails")
     )
-    for session_id, user_email in queryset:
-        other_viewers[session_id].append(str(user_email))
 
-    return other_viewers
+    viewed_session_recordings: set[str] = set()
+    other_viewers: dict[str, list[str]] = {str(x): [] for x in recording_ids_in_list}
+    for session_id, viewed_by_user, other_viewer_emails in queryset:
+        if viewed_by_user:
+            viewed_session_recordings.add(session_id)
+        # the aggregate is null when only the user has viewed the recording
+        if other_viewer_emails:
+            other_viewers[session_id] = [str(email) for email in other_viewer_emails]
+
+    return viewed_session_recordings, other_viewers
 
 
 def current_user_viewed(recording_ids_in_list: list[str], user: User | None, team: Team) -> set[str]:
@@ -1224,37 +1556,73 @@ def current_user_viewed(recording_ids_in_list: list[str], user: User | None, tea
     return viewed_session_recordings
 
 
+# the flag rarely changes, and a user asking for summaries tends to ask for several in a row,
+# so it's fine to hang on to the evaluation for a little while
+_session_summary_enabled_cache: TTLCache[Any, bool] = TTLCache(maxsize=1024, ttl=30)
+_session_summary_enabled_lock = threading.Lock()
+
+
+@cached(cache=_session_summary_enabled_cache, lock=_session_summary_enabled_lock)
+def session_summary_enabled(distinct_id: str) -> bool:
+    return bool(posthoganalytics.feature_enabled("ai-session-summary", distinct_id))
+
+
+# a user paging through recordings asks for the same flags on every page,
+# so each worker process hangs on to the evaluation for 30 seconds, just as we do for the session summary flag.
+# a flag change can take that long to be picked up by listing
+_flags_and_payloads_cache: TTLCache[Any, dict] = TTLCache(maxsize=1024, ttl=30)
+_flags_and_payloads_lock = threading.Lock()
+
+
+@cached(cache=_flags_and_payloads_cache, lock=_flags_and_payloads_lock)
+def flags_and_payloads(distinct_id: str, organization_id: str) -> dict:
+    return (
+        posthoganalytics.get_all_flags_and_payloads(
+            distinct_id,
+            groups={"organization": organization_id},
+        )
+        or {}
+    )
+
+
+def clear_flag_evaluation_caches() -> None:
+    with _session_summary_enabled_lock:
+        _session_summary_enabled_cache.clear()
+    with _flags_and_payloads_lock:
+        _flags_and_payloads_cache.clear()
+
+
 def safely_read_modifiers_overrides(distinct_id: str, team: Team) -> HogQLQueryModifiers:
     modifiers = HogQLQueryModifiers()
 
     try:
-        groups = {"organization": str(team.organization.id)}
         flag_key = "HOG_QL_ORG_QUERY_OVERRIDES"
-        flags_n_bags = posthoganalytics.get_all_flags_and_payloads(
-            distinct_id,
-            groups=groups,
-        )
-        # this loads nothing whereas the payload is available
-        # modifier_overrides = posthoganalytics.get_feature_flag_payload(
-        #     flag_key,
-        #     distinct_id,
-        #     groups=groups,
-        # )
-        modifier_overrides = (flags_n_bags or {}).get("featureFlagPayloads", {}).get(flag_key, None)
+        flags_n_bags = flags_and_payloads(distinct_id, str(team.organization.id))
+        # get_feature_flag_payload loads nothing here whereas the payload is available in the full set of flags
+        modifier_overrides = flags_n_bags.get("featureFlagPayloads", {}).get(flag_key, None)
         if modifier_overrides:
-            modifiers.optimizeJoinedFilters = json.loads(modifier_overrides).get("optimizeJoinedFilters", None)
-    except:
-        # be extra safe
-        pass
+            # depending on the SDK the payload can arrive already parsed
+            if isinstance(modifier_overrides, str | bytes):
+                modifier_overrides = orjson.loads(modifier_overrides)
+            modifiers.optimizeJoinedFilters = modifier_overrides.get("optimizeJoinedFilters", None)
+    except Exception as e:
+        # be extra safe, a broken payload shouldn't break listing recordings
+        logger.warning("could not read hogql modifier overrides", team_id=team.pk, error=str(e))
 
     return modifiers
 
 
+# hogql timing keys come from a small, fixed set of query stages, so they're worth remembering
+@lru_cache(maxsize=4096)
+def _normalize_timing_key(key: str) -> str:
+    return f"hogql_{key.lstrip('./').replace('/', '_')}"
+
+
 def _generate_timings(hogql_timings: list[QueryTiming] | None, timer: ServerTimingsGathered) -> dict[str, float]:
     timings_dict = timer.get_all_timings()
     hogql_timings_dict = {}
     for key, value in hogql_timings or {}:
-        new_key = f"hogql_{key[1].lstrip('./').replace('/', '_')}"
+        new_key = _normalize_timing_key(key[1])
         # HogQL query timings are in seconds, convert to milliseconds
         hogql_timings_dict[new_key] = value[1] * 1000
     all_timings = {**timings_dict, **hogql_timings_dict}
@@ -1273,7 +1641,13 @@ def _get_openai_client() -> OpenAI:
     if not client:
         raise exceptions.ValidationError("PostHog analytics client is not configured")
 
-    return OpenAI(posthog_client=client)
+    return _build_openai_client(client)
+
+
+# building the client sets up its connection pool, so we keep hold of it and reuse its connections to OpenAI
+@lru_cache(maxsize=1)
+def _build_openai_client(posthog_client: PostHogClient) -> OpenAI:
+    return OpenAI(posthog_client=posthog_client)
 
 
 def create_openai_messages(system_content: str, user_content: str) -> list[ChatCompletionMessageParam]:
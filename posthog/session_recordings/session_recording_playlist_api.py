@@ -5,6 +5,7 @@ import posthoganalytics
 import structlog
 from django.db import IntegrityError
 from django.db.models import Q, QuerySet
+from django.http import HttpResponse
 from django.utils.timezone import now
 from django_filters.rest_framework import DjangoFilterBackend
 from loginas.utils import is_impersonated_session
@@ -294,7 +295,7 @@ class SessionRecordingPlaylistViewSet(TeamAndOrgViewSetMixin, ForbidDestroyModel
 
     # As of now, you can only "update" a session recording by adding or removing a recording from a static playlist
     @action(methods=["GET"], detail=True, url_path="recordings")
-    def recordings(self, request: request.Request, *args: Any, **kwargs: Any) -> response.Response:
+    def recordings(self, request: request.Request, *args: Any, **kwargs: Any) -> HttpResponse:
         playlist = self.get_object()
         playlist_items = list(
             SessionRecordingPlaylistItem.objects.filter(playlist=playlist)
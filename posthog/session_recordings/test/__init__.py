@@ -13,6 +13,7 @@ def setup_stream_from(headers: dict | None = None) -> Mock:
     streaming_interaction.status_code = 200
     streaming_interaction.content = b"Example content"
     streaming_interaction.raw = b"Example content"
+    streaming_interaction.iter_content = Mock(side_effect=lambda chunk_size=1: iter([b"Example content"]))
 
     # Setup headers and the .get method for headers
     streaming_interaction.headers = headers
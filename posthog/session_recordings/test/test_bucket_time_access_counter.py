@@ -0,0 +1,34 @@
+from unittest.mock import MagicMock, patch
+
+from django.test.testcases import SimpleTestCase
+
+from posthog.session_recordings.session_recording_api import BucketTimeAccessCounter
+
+
+@patch("posthog.session_recordings.session_recording_api.time.monotonic")
+class TestBucketTimeAccessCounter(SimpleTestCase):
+    def test_counts_previous_accesses_within_the_window(self, mock_monotonic: MagicMock) -> None:
+        counter = BucketTimeAccessCounter(bucket_seconds=60, bucket_count=2)
+
+        mock_monotonic.return_value = 0
+        assert counter.increment("a") == 0
+        assert counter.increment("a") == 1
+        assert counter.increment("b") == 0
+
+        # the next bucket still sees the previous one
+        mock_monotonic.return_value = 61
+        assert counter.increment("a") == 2
+
+        # the first bucket has now fallen out of the window
+        mock_monotonic.return_value = 121
+        assert counter.increment("a") == 1
+
+    def test_gaps_longer_than_the_window_reset_counts(self, mock_monotonic: MagicMock) -> None:
+        counter = BucketTimeAccessCounter(bucket_seconds=60, bucket_count=5)
+
+        mock_monotonic.return_value = 0
+        counter.increment("a")
+        counter.increment("a")
+
+        mock_monotonic.return_value = 60 * 10
+        assert counter.increment("a") == 0
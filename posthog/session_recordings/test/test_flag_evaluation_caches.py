@@ -0,0 +1,41 @@
+from unittest.mock import MagicMock, patch
+
+from django.test.testcases import SimpleTestCase
+
+from posthog.session_recordings.session_recording_api import (
+    clear_flag_evaluation_caches,
+    flags_and_payloads,
+    session_summary_enabled,
+)
+
+
+class TestFlagEvaluationCaches(SimpleTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        clear_flag_evaluation_caches()
+
+    @patch("posthog.session_recordings.session_recording_api.posthoganalytics.feature_enabled", return_value=True)
+    def test_session_summary_flag_is_evaluated_once_within_the_ttl(self, mock_feature_enabled: MagicMock) -> None:
+        assert session_summary_enabled("a user")
+        assert session_summary_enabled("a user")
+        mock_feature_enabled.assert_called_once_with("ai-session-summary", "a user")
+
+        # each user gets their own evaluation
+        assert session_summary_enabled("another user")
+        assert mock_feature_enabled.call_count == 2
+
+        clear_flag_evaluation_caches()
+        assert session_summary_enabled("a user")
+        assert mock_feature_enabled.call_count == 3
+
+    @patch(
+        "posthog.session_recordings.session_recording_api.posthoganalytics.get_all_flags_and_payloads",
+        return_value={"featureFlags": {"a-flag": True}, "featureFlagPayloads": {}},
+    )
+    def test_flags_and_payloads_are_evaluated_once_within_the_ttl(self, mock_get_all: MagicMock) -> None:
+        assert flags_and_payloads("a user", "an org") == {"featureFlags": {"a-flag": True}, "featureFlagPayloads": {}}
+        assert flags_and_payloads("a user", "an org") == {"featureFlags": {"a-flag": True}, "featureFlagPayloads": {}}
+        mock_get_all.assert_called_once_with("a user", groups={"organization": "an org"})
+
+        flags_and_payloads("a user", "another org")
+        assert mock_get_all.call_count == 2
@@ -121,7 +121,7 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
         response = self.client.get(
             f"/api/projects/{self.team.id}/session_recordings/{session_id}/snapshots?{'&'.join(query_parameters)}"
         )
-        response_data = response.content.decode("utf-8")
+        response_data = b"".join(response.streaming_content).decode("utf-8")
 
         assert mock_list_objects.call_args_list == []
 
@@ -0,0 +1,53 @@
+from django.test.testcases import SimpleTestCase
+from parameterized import parameterized
+
+from posthog.session_recordings.session_recording_api import filter_from_params_to_query, query_as_params_to_dict
+
+
+class TestQueryAsParamsToDict(SimpleTestCase):
+    @parameterized.expand(
+        [
+            ({"source": "blob"}, {"source": "blob"}),
+            ({"limit": "20"}, {"limit": 20}),
+            ({"offset": "-1"}, {"offset": -1}),
+            ({"filter_test_accounts": "true"}, {"filter_test_accounts": True}),
+            ({"operand": "false"}, {"operand": False}),
+            ({"person_uuid": "null"}, {"person_uuid": None}),
+            ({"date_from": '"-3d"'}, {"date_from": "-3d"}),
+            ({"session_ids": '["a", "b"]'}, {"session_ids": ["a", "b"]}),
+            ({"order": '{"key": "value"}'}, {"order": {"key": "value"}}),
+            # looks like it could be JSON but isn't
+            ({"name": "fancy"}, {"name": "fancy"}),
+            ({"date_from": "-3d"}, {"date_from": "-3d"}),
+            ({"empty": ""}, {"empty": ""}),
+            ({"already_parsed": 1}, {"already_parsed": 1}),
+            ({"as_query": "true", "limit": "1"}, {"limit": 1}),
+            # too long for orjson, which would return floats
+            ({"value": "123456789012345678901234567890"}, {"value": 123456789012345678901234567890}),
+            ({"value": "-9223372036854775809"}, {"value": -9223372036854775809}),
+            (
+                {"properties": '[{"key": "id", "value": 123456789012345678901234567890}]'},
+                {"properties": [{"key": "id", "value": 123456789012345678901234567890}]},
+            ),
+            ({"value": "12345678901234567890123 not json"}, {"value": "12345678901234567890123 not json"}),
+        ]
+    )
+    def test_query_as_params_to_dict(self, params: dict, expected: dict) -> None:
+        assert query_as_params_to_dict(params) == expected
+
+
+class TestFilterFromParamsToQuery(SimpleTestCase):
+    def test_callers_do_not_share_nested_state_of_the_cached_query(self) -> None:
+        params = {
+            "filter_test_accounts": "true",
+            "properties": '[{"key": "$browser", "value": ["Chrome"], "operator": "exact", "type": "event"}]',
+        }
+
+        first = filter_from_params_to_query(params)
+        assert first.properties is not None
+        # this is what the listing query does with the test account filters
+        first.properties += [first.properties[0]]
+
+        second = filter_from_params_to_query(params)
+        assert second.properties is not None
+        assert len(second.properties) == 1
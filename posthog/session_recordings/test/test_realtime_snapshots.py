@@ -0,0 +1,36 @@
+from unittest.mock import MagicMock, patch
+
+from django.test.testcases import SimpleTestCase
+
+from posthog.session_recordings import realtime_snapshots
+from posthog.session_recordings.realtime_snapshots import maybe_publish_subscription
+
+
+@patch("posthog.session_recordings.realtime_snapshots.publish_subscription")
+@patch("posthog.session_recordings.realtime_snapshots.monotonic")
+class TestMaybePublishSubscription(SimpleTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        realtime_snapshots._subscription_publish_buckets.clear()
+
+    def test_allows_a_burst_then_limits_publishing(self, mock_monotonic: MagicMock, mock_publish: MagicMock) -> None:
+        mock_monotonic.return_value = 1000.0
+
+        assert [maybe_publish_subscription("1", "session") for _ in range(3)] == [True, True, False]
+        assert mock_publish.call_count == 2
+
+        # one token is replenished every ten seconds
+        mock_monotonic.return_value = 1010.0
+        assert maybe_publish_subscription("1", "session") is True
+        assert maybe_publish_subscription("1", "session") is False
+        assert mock_publish.call_count == 3
+
+    def test_limits_each_session_separately(self, mock_monotonic: MagicMock, mock_publish: MagicMock) -> None:
+        mock_monotonic.return_value = 1000.0
+
+        maybe_publish_subscription("1", "session")
+        maybe_publish_subscription("1", "session")
+
+        assert maybe_publish_subscription("1", "session") is False
+        assert maybe_publish_subscription("1", "another-session") is True
+        assert maybe_publish_subscription("2", "session") is True
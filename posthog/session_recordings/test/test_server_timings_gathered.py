@@ -0,0 +1,18 @@
+from unittest.mock import patch
+
+from django.test.testcases import SimpleTestCase
+
+from posthog.session_recordings.session_recording_api import ServerTimingsGathered
+
+
+class TestServerTimingsGathered(SimpleTestCase):
+    @patch("posthog.session_recordings.session_recording_api.time.perf_counter_ns")
+    def test_nested_timings_are_reported_in_milliseconds(self, mock_perf_counter_ns) -> None:
+        mock_perf_counter_ns.side_effect = [0, 1_000_000, 3_500_000, 10_000_000]
+        timer = ServerTimingsGathered()
+
+        with timer("outer"):
+            with timer("inner"):
+                pass
+
+        assert timer.get_all_timings() == {"inner": 2.5, "outer": 10.0}
@@ -6,10 +6,12 @@ from typing import cast
 from unittest.mock import ANY, MagicMock, call, patch
 from urllib.parse import urlencode
 
+import httpx
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
 from django.utils.timezone import now
 from freezegun import freeze_time
+from openai import APITimeoutError
 from parameterized import parameterized
 import pytest
 from rest_framework import status
@@ -22,6 +24,12 @@ from posthog.schema import RecordingsQuery, LogEntryPropertyFilter
 from posthog.session_recordings.models.session_recording_event import (
     SessionRecordingViewed,
 )
+from posthog.session_recordings.session_recording_api import (
+    HOT_BLOB_LISTING_THRESHOLD,
+    STREAM_RESPONSE_TO_CLIENT_HISTOGRAM,
+    BucketTimeAccessCounter,
+    SessionRecordingSerializer,
+)
 from posthog.session_recordings.queries.test.session_replay_sql import (
     produce_replay_summary,
 )
@@ -235,6 +243,33 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
         self.produce_replay_summary(distinct_id, session_id, base_time + relativedelta(seconds=10))
         flush_persons_and_events()
 
+    def test_list_serializer_matches_single_recording_serializer(self) -> None:
+        person = Person.objects.create(team=self.team, distinct_ids=["user"], properties={"email": "bob@bob.com"})
+        with_everything = SessionRecording(
+            team=self.team,
+            session_id="1",
+            distinct_id="user",
+            duration=30,
+            active_seconds=20,
+            inactive_seconds=10,
+            start_time=datetime(2023, 1, 1, 12, 0, 0, tzinfo=UTC),
+            end_time=datetime(2023, 1, 1, 12, 0, 30, tzinfo=UTC),
+            click_count=4,
+            start_url="https://example.com",
+        )
+        with_everything.person = person
+        with_everything.viewed = True  # type: ignore
+        with_everything.viewers = ["someone@example.com"]  # type: ignore
+        with_everything.ongoing = True  # type: ignore
+        with_everything.activity_score = 0.5  # type: ignore
+        with_nothing = SessionRecording(team=self.team, session_id="2", distinct_id="missing")
+
+        recordings = [with_everything, with_nothing]
+        context = {"get_team": lambda: self.team}
+        listed = SessionRecordingSerializer(recordings, many=True, context=context).data
+
+        assert listed == [SessionRecordingSerializer(recording, context=context).data for recording in recordings]
+
     def test_session_recordings_dont_leak_teams(self) -> None:
         another_team = Team.objects.create(organization=self.organization)
         Person.objects.create(
@@ -685,6 +720,23 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
             self.assertEqual(response_data["results"][1]["id"], "2")
             self.assertEqual(response_data["results"][2]["id"], "3")
 
+    def test_session_ids_filter_keeps_the_requested_order_for_persisted_recordings(self):
+        for session_id in ["1", "2", "3"]:
+            SessionRecording.objects.create(
+                team=self.team,
+                session_id=session_id,
+                distinct_id="user",
+                deleted=False,
+                object_storage_path=f"an lts stored object path/{session_id}",
+            )
+
+        # all of them are found in postgres, so clickhouse is never asked for them
+        params_string = urlencode({"session_ids": '["2", "3", "1"]'})
+        response = self.client.get(f"/api/projects/{self.team.id}/session_recordings?{params_string}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        assert [r["id"] for r in response.json()["results"]] == ["2", "3", "1"]
+
     def test_empty_list_session_ids_filter_returns_no_recordings(self):
         with freeze_time("2020-09-13T12:26:40.000Z"):
             Person.objects.create(
@@ -827,6 +879,60 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
             call("an lts stored object path"),
         ]
 
+    @freeze_time("2023-01-01T00:00:00Z")
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api._blob_listing_access_counter", BucketTimeAccessCounter())
+    @patch("posthog.session_recordings.session_recording_api.object_storage.list_objects")
+    def test_get_snapshots_v2_caches_the_listing_of_a_hot_lts_recording(
+        self, mock_list_objects: MagicMock, _mock_exists: MagicMock
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        timestamp = round(now().timestamp() * 1000)
+        SessionRecording.objects.create(
+            team=self.team,
+            session_id=session_id,
+            deleted=False,
+            storage_version="2023-08-01",
+            object_storage_path="an lts stored object path",
+        )
+        mock_list_objects.return_value = [f"an lts stored object path/{timestamp - 10000}-{timestamp}"]
+
+        for _ in range(HOT_BLOB_LISTING_THRESHOLD + 3):
+            response = self.client.get(f"/api/projects/{self.team.id}/session_recordings/{session_id}/snapshots")
+            assert response.status_code == status.HTTP_200_OK
+            assert len(response.json()["sources"]) == 1
+
+        # listed until the recording is hot, then once more to fill the cache
+        assert mock_list_objects.call_args_list == [call("an lts stored object path")] * (
+            HOT_BLOB_LISTING_THRESHOLD + 1
+        )
+
+    @freeze_time("2023-01-01T00:00:00Z")
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api._blob_listing_access_counter", BucketTimeAccessCounter())
+    @patch("posthog.session_recordings.session_recording_api.object_storage.list_objects")
+    def test_get_snapshots_v2_never_caches_the_listing_of_an_ingestion_path_recording(
+        self, mock_list_objects: MagicMock, _mock_exists: MagicMock
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        old_timestamp = round((now() - timedelta(hours=26)).timestamp() * 1000)
+        blob_prefix = f"session_recordings/team_id/{self.team.pk}/session_id/{session_id}/data"
+        mock_list_objects.return_value = [f"{blob_prefix}/{old_timestamp - 10000}-{old_timestamp}"]
+
+        calls = HOT_BLOB_LISTING_THRESHOLD + 3
+        for _ in range(calls):
+            response = self.client.get(f"/api/projects/{self.team.id}/session_recordings/{session_id}/snapshots")
+            assert response.status_code == status.HTTP_200_OK
+
+        # a live session gains blobs, so every request has to list them
+        assert mock_list_objects.call_args_list == [call(blob_prefix)] * calls
+
     @freeze_time("2023-01-01T00:00:00Z")
     @patch(
         "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
@@ -886,6 +992,9 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
 
         response = self.client.get(url)
         assert response.status_code == status.HTTP_200_OK
+        assert b"".join(response.streaming_content) == b"Example content"
+        # the object storage response is closed once the body has been sent
+        assert _mock_stream_from.return_value.__exit__.call_count == 1
 
         # default headers if the object store does nothing
         assert response.headers.__dict__ == {
@@ -895,7 +1004,6 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
                 "content-disposition": ("Content-Disposition", "inline"),
                 "allow": ("Allow", "GET, HEAD, OPTIONS"),
                 "x-frame-options": ("X-Frame-Options", "SAMEORIGIN"),
-                "content-length": ("Content-Length", "15"),
                 "vary": ("Vary", "Origin"),
                 "x-content-type-options": ("X-Content-Type-Options", "nosniff"),
                 "referrer-policy": ("Referrer-Policy", "same-origin"),
@@ -903,6 +1011,34 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
             }
         }
 
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch("posthog.session_recordings.session_recording_api.object_storage.get_presigned_url")
+    @patch("posthog.session_recordings.session_recording_api.stream_from", return_value=setup_stream_from())
+    def test_blob_stream_duration_is_recorded_once_the_body_has_been_sent(
+        self,
+        _mock_stream_from,
+        mock_presigned_url,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+        mock_presigned_url.return_value = "https://test.com/"
+
+        with patch.object(STREAM_RESPONSE_TO_CLIENT_HISTOGRAM, "observe") as mock_observe:
+            response = self.client.get(
+                f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob&blob_key=1682608337071"
+            )
+            assert response.status_code == status.HTTP_200_OK
+            mock_observe.assert_not_called()
+
+            assert b"".join(response.streaming_content) == b"Example content"
+            mock_observe.assert_called_once()
+
     @patch(
         "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
         return_value=True,
@@ -951,6 +1087,46 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
         assert response.headers.get("etag") == "represents the file contents"  # we don't allow weak etags
         assert response.headers.get("cache-control") == "more specific cache control"
 
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch("posthog.session_recordings.session_recording_api.object_storage.get_presigned_url")
+    @patch(
+        "posthog.session_recordings.session_recording_api.stream_from",
+        return_value=setup_stream_from({"ETag": '"represents the file contents"'}),
+    )
+    def test_known_etag_is_not_modified_without_going_to_object_storage(
+        self,
+        mock_stream_from,
+        mock_presigned_url,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        blob_key = f"1682608337071"
+        url = f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob&blob_key={blob_key}"
+
+        # by default a session recording is deleted, so we have to explicitly mark the mock as not deleted
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+        mock_presigned_url.return_value = "https://test.com/"
+
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers.get("etag") == '"represents the file contents"'
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"represents the file contents"')
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED
+        assert response.headers.get("etag") == '"represents the file contents"'
+
+        # a different e-tag still goes to object storage
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='"some other contents"')
+        assert response.status_code == status.HTTP_200_OK
+
+        assert mock_presigned_url.call_count == 2
+        assert mock_stream_from.call_count == 2
+
     @patch(
         "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
         return_value=True,
@@ -1042,9 +1218,40 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
         ]
 
         response = self.client.get(url)
-        assert response.status_code == status.HTTP_200_OK, response.json()
+        assert response.status_code == status.HTTP_200_OK
         assert response.headers.get("content-type") == "application/json"
-        assert response.content == expected_response
+        content = b"".join(response.streaming_content)
+        assert content == expected_response
+
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch("posthog.session_recordings.session_recording_api.get_realtime_snapshots")
+    def test_can_get_session_recording_realtime_with_lone_surrogates(
+        self,
+        mock_realtime_snapshots,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        url = f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=realtime"
+
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+
+        # a truncated console log can leave half a surrogate pair behind
+        mock_realtime_snapshots.return_value = [
+            json.dumps({"some": "\ud801 half a pair"}),
+            json.dumps({"some": "more data"}),
+        ]
+
+        response = self.client.get(url)
+        assert response.status_code == status.HTTP_200_OK
+        assert (
+            b"".join(response.streaming_content)
+            == b'{"snapshots":[{"some":"\\ud801 half a pair"},{"some":"more data"}]}'
+        )
 
     @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
     @patch("posthog.session_recordings.session_recording_api.object_storage.get_presigned_url")
@@ -1307,3 +1514,16 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
             in response.json()["detail"]
         )
         assert response.json() == self.snapshot
+
+    @patch("posthog.session_recordings.session_recording_api._get_openai_client")
+    def test_ai_regex_returns_gateway_timeout_when_openai_times_out(self, mock_get_openai_client: MagicMock) -> None:
+        mock_get_openai_client.return_value.beta.chat.completions.parse.side_effect = APITimeoutError(
+            request=httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+        )
+
+        response = self.client.post(
+            f"/api/projects/{self.team.id}/session_recordings/ai/regex", {"regex": "match all the urls"}
+        )
+
+        assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT, response.json()
+        assert response.json()["code"] == "ai_completion_timeout"
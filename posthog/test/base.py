@@ -588,6 +588,11 @@ class APIBaseTest(PostHogTestCase, ErrorResponsesMixin, DRFTestCase):
         # Clear the is_rate_limit lru_Caches so that they do not flap in test snapshots
         rate_limit.is_rate_limit_enabled.cache_clear()
         rate_limit.get_team_allow_list.cache_clear()
+        rate_limit.clear_local_token_buckets()
+        # test users are created once per class, so flag evaluations cached against them must not leak between tests
+        from posthog.session_recordings.session_recording_api import clear_flag_evaluation_caches
+
+        clear_flag_evaluation_caches()
 
         if self.CONFIG_AUTO_LOGIN and self.user:
             self.client.force_login(self.user)
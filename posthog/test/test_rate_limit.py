@@ -1,7 +1,8 @@
 import base64
 import json
+import time
 from datetime import timedelta
-from unittest.mock import ANY, call, patch
+from unittest.mock import ANY, MagicMock, call, patch
 from urllib.parse import quote
 
 from django.core.cache import cache
@@ -18,7 +19,7 @@ from posthog.models import Team
 from posthog.models.instance_setting import override_instance_config
 from posthog.models.personal_api_key import PersonalAPIKey, hash_key_value
 from posthog.models.utils import generate_random_token_personal
-from posthog.rate_limit import HogQLQueryThrottle
+from posthog.rate_limit import HogQLQueryThrottle, LocalTokenBucketPersonalApiKeyRateThrottle
 from posthog.test.base import APIBaseTest
 
 
@@ -481,3 +482,75 @@ class TestUserAPI(APIBaseTest):
                     )
                     self.assertEqual(response.status_code, status.HTTP_200_OK)
                 assert call("rate_limit_exceeded", tags=ANY) not in incr_mock.mock_calls
+
+    def test_local_token_bucket_throttle_only_writes_shared_history_every_sync(self):
+        class TestLocalTokenBucketThrottle(LocalTokenBucketPersonalApiKeyRateThrottle):
+            scope = "test_local_token_bucket"
+            rate = "5/minute"
+            sync_every = 2
+
+        personal_api_key = (self.personal_api_key, "header")
+        request = MagicMock()
+        cache_key = f"throttle_test_local_token_bucket_{self.hashed_personal_api_key}"
+
+        assert TestLocalTokenBucketThrottle().request_would_be_allowed(request, None, personal_api_key)
+        assert cache.get(cache_key) is None
+
+        assert TestLocalTokenBucketThrottle().request_would_be_allowed(request, None, personal_api_key)
+        assert len(cache.get(cache_key)) == 2
+
+        allowed = [
+            TestLocalTokenBucketThrottle().request_would_be_allowed(request, None, personal_api_key) for _ in range(4)
+        ]
+        assert allowed == [True, True, True, False]
+        assert len(cache.get(cache_key)) == 4
+
+    def test_local_token_bucket_throttle_respects_shared_history(self):
+        class TestLocalTokenBucketThrottle(LocalTokenBucketPersonalApiKeyRateThrottle):
+            scope = "test_local_token_bucket"
+            rate = "5/minute"
+            sync_every = 1
+
+        personal_api_key = (self.personal_api_key, "header")
+        cache_key = f"throttle_test_local_token_bucket_{self.hashed_personal_api_key}"
+
+        # another process has already used the allowance
+        cache.set(cache_key, [time.time()] * 5, 60)
+        assert not TestLocalTokenBucketThrottle().request_would_be_allowed(MagicMock(), None, personal_api_key)
+
+    def test_local_token_bucket_throttle_counts_accepted_requests_when_shared_history_denies(self):
+        class TestLocalTokenBucketThrottle(LocalTokenBucketPersonalApiKeyRateThrottle):
+            scope = "test_local_token_bucket"
+            rate = "5/minute"
+            sync_every = 3
+
+        personal_api_key = (self.personal_api_key, "header")
+        request = MagicMock()
+        cache_key = f"throttle_test_local_token_bucket_{self.hashed_personal_api_key}"
+
+        assert TestLocalTokenBucketThrottle().request_would_be_allowed(request, None, personal_api_key)
+        assert TestLocalTokenBucketThrottle().request_would_be_allowed(request, None, personal_api_key)
+
+        # meanwhile another process uses the allowance
+        cache.set(cache_key, [time.time()] * 5, 60)
+        assert not TestLocalTokenBucketThrottle().request_would_be_allowed(request, None, personal_api_key)
+        # the two requests this process accepted are still written, the denied one isn't
+        assert len(cache.get(cache_key)) == 7
+
+    def test_local_token_bucket_throttle_waits_for_the_next_token(self):
+        class TestLocalTokenBucketThrottle(LocalTokenBucketPersonalApiKeyRateThrottle):
+            scope = "test_local_token_bucket"
+            rate = "5/minute"
+
+        personal_api_key = (self.personal_api_key, "header")
+        request = MagicMock()
+
+        for _ in range(5):
+            assert TestLocalTokenBucketThrottle().request_would_be_allowed(request, None, personal_api_key)
+
+        throttle = TestLocalTokenBucketThrottle()
+        assert not throttle.request_would_be_allowed(request, None, personal_api_key)
+        # a token comes back every 12 seconds, not the 10 DRF works out from the empty shared history
+        wait = throttle.wait()
+        assert wait is not None
+        assert 11 < wait <= 12